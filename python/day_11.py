@@ -1,4 +1,5 @@
 import enum
+import numpy
 from typing import List, Tuple
 
 import utils
@@ -19,7 +20,17 @@ class Map:
         self._seats = [
             Seat(seat) for row in seats for seat in row
         ]
-        self._last_updated: List[Tuple[int, Seat]] = list(enumerate(self._seats))
+
+        # Seats to evaluate next step. The bitmap only dedupes the frontier
+        # while it is built and is cleared entry by entry, so a step costs
+        # time proportional to the frontier rather than the grid.
+        self._frontier = [
+            index for index, seat in enumerate(self._seats)
+            if seat != Seat.FLOOR
+        ]
+        self._in_frontier = bytearray(len(self._seats))
+        for index in self._frontier:
+            self._in_frontier[index] = 1
 
     @property
     def occupied_seats(self) -> int:
@@ -33,17 +44,18 @@ class Map:
             raise IndexError
         return self._seats[y*self._width + x]
 
-    def _get_neighbours(self, index: int):
+    def _get_neighbour_indices(self, index: int):
         row, column = index // self._width, index % self._width
         for y in [row - 1, row, row + 1]:
             for x in [column - 1, column, column + 1]:
                 if x == column and y == row:
                     continue
-                else:
-                    try:
-                        yield self[x,y]
-                    except IndexError:
-                        pass
+                if 0 <= x < self._width and 0 <= y < self._height:
+                    yield y*self._width + x
+
+    def _get_neighbours(self, index: int):
+        for neighbour in self._get_neighbour_indices(index):
+            yield self._seats[neighbour]
 
     def _evaluate(self, index: int) -> Seat:
         occupied_neighbours = sum(
@@ -58,18 +70,27 @@ class Map:
 
     def _step(self):
         updated = []
-        for index, _ in self._last_updated:
+        for index in self._frontier:
+            self._in_frontier[index] = 0
             new_seat = self._evaluate(index)
             if new_seat != self._seats[index]:
                 updated.append((index, new_seat))
 
+        frontier = []
         for index, new_seat in updated:
-           self._seats[index] = new_seat
+            self._seats[index] = new_seat
+            for seat in (index, *self._get_neighbour_indices(index)):
+                if (
+                    not self._in_frontier[seat]
+                    and self._seats[seat] != Seat.FLOOR
+                ):
+                    self._in_frontier[seat] = 1
+                    frontier.append(seat)
 
-        self._last_updated = updated
+        self._frontier = frontier
 
     def run(self) -> int:
-        while self._last_updated:
+        while self._frontier:
             #print(str(self))
             self._step()
 
@@ -83,27 +104,145 @@ class Map:
         return "".join(map)
 
 
+DIRECTIONS = [
+    (1,0), (1,1), (0,1), (-1,1), (-1,0), (-1,-1), (0,-1), (1,-1)
+]
+
+
+def get_visible_seats(seats: List[str]) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    # The first non-floor cell along each of the eight rays never changes,
+    # so the line-of-sight graph is computed once up front. It is returned
+    # in CSR form: the seats visible from cell i are
+    # indices[offsets[i]:offsets[i + 1]].
+    width, height = len(seats[0]), len(seats)
+    offsets = numpy.zeros(width * height + 1, dtype=numpy.int32)
+    indices = []
+    for y, row in enumerate(seats):
+        for x, seat in enumerate(row):
+            if seat != Seat.FLOOR.value:
+                for x_step, y_step in DIRECTIONS:
+                    x_seen, y_seen = x + x_step, y + y_step
+                    while (
+                        0 <= x_seen < width and 0 <= y_seen < height
+                        and seats[y_seen][x_seen] == Seat.FLOOR.value
+                    ):
+                        x_seen += x_step
+                        y_seen += y_step
+                    if 0 <= x_seen < width and 0 <= y_seen < height:
+                        indices.append(y_seen*width + x_seen)
+            offsets[y*width + x + 1] = len(indices)
+
+    return offsets, numpy.array(indices, dtype=numpy.int32)
+
+
 class Map2(Map):
     MAX_OCCUPIED = 5
 
-    def _get_neighbours(self, index: int):
-        row, col = index % self._width, index // self._width
-        directions = [
-            (1,0), (1,1), (0,1), (-1,1), (-1,0), (-1,-1), (0,-1), (1,-1)
+    def __init__(self, seats: List[str]):
+        super().__init__(seats)
+        offsets, indices = get_visible_seats(seats)
+        # The stepping loop is pure Python, so it reads plain int lists
+        # rather than indexing with NumPy scalars.
+        offsets, indices = offsets.tolist(), indices.tolist()
+        self._visible_seats = [
+            indices[offsets[index]:offsets[index + 1]]
+            for index in range(len(self._seats))
         ]
 
-        for x_step, y_step in directions:
-            step = 1
-            try:
-                while True:
-                    x = row + x_step*step
-                    y = col + y_step*step
-                    if self[x, y] != Seat.FLOOR:
-                        yield self[x, y]
-                        break
-                    step += 1
-            except IndexError:
-                pass
+    def _get_neighbour_indices(self, index: int):
+        return self._visible_seats[index]
+
+
+class DenseMap:
+    MAX_OCCUPIED = 4
+
+    def __init__(self, seats: List[str]):
+        layout = numpy.array([list(row) for row in seats])
+        # Pad with a ring of floor so every seat has eight in-bounds cells.
+        self._is_seat = numpy.pad(layout != Seat.FLOOR.value, 1)
+        self._occupied = numpy.pad(
+            layout == Seat.OCCUPIED.value, 1
+        ).astype(numpy.int8)
+
+    @property
+    def occupied_seats(self) -> int:
+        return int(self._occupied.sum())
+
+    def _step(self) -> bool:
+        occupied = self._occupied
+        height, width = occupied.shape
+        neighbours = numpy.zeros((height - 2, width - 2), dtype=numpy.int8)
+        for y in range(3):
+            for x in range(3):
+                if x == 1 and y == 1:
+                    continue
+                neighbours += occupied[y:y + height - 2, x:x + width - 2]
+
+        inner = occupied[1:-1, 1:-1]
+        new_inner = numpy.where(
+            inner == 1,
+            neighbours < self.MAX_OCCUPIED,
+            neighbours == 0,
+        ) & self._is_seat[1:-1, 1:-1]
+
+        changed = bool((new_inner != inner).any())
+        inner[...] = new_inner
+        return changed
+
+    def run(self):
+        while self._step():
+            pass
+
+
+class DenseMap2:
+    MAX_OCCUPIED = 5
+
+    def __init__(self, seats: List[str]):
+        layout = numpy.array([list(row) for row in seats]).ravel()
+        seat_cells = numpy.flatnonzero(layout != Seat.FLOOR.value)
+
+        # Seats are renumbered densely and their visible seats stored as an
+        # (n, 8) index table. Missing neighbours point at an extra slot n
+        # that is always empty.
+        seat_ids = numpy.full(len(layout), len(seat_cells), dtype=numpy.int32)
+        seat_ids[seat_cells] = numpy.arange(len(seat_cells))
+        offsets, indices = get_visible_seats(seats)
+        self._neighbours = numpy.full(
+            (len(seat_cells), len(DIRECTIONS)), len(seat_cells),
+            dtype=numpy.int32,
+        )
+        # Floor cells have no entries, so the CSR rows of the seats are
+        # contiguous and in seat order.
+        counts = numpy.diff(offsets)[seat_cells]
+        rows = numpy.repeat(numpy.arange(len(seat_cells)), counts)
+        columns = numpy.arange(len(indices)) - numpy.repeat(
+            offsets[seat_cells], counts
+        )
+        self._neighbours[rows, columns] = seat_ids[indices]
+
+        self._occupied = numpy.zeros(len(seat_cells) + 1, dtype=numpy.int8)
+        self._occupied[:-1] = layout[seat_cells] == Seat.OCCUPIED.value
+
+    @property
+    def occupied_seats(self) -> int:
+        return int(self._occupied.sum())
+
+    def _step(self) -> bool:
+        neighbours = self._occupied[self._neighbours].sum(axis=1)
+        occupied = self._occupied[:-1]
+        new_occupied = numpy.where(
+            occupied == 1,
+            neighbours < self.MAX_OCCUPIED,
+            neighbours == 0,
+        )
+
+        changed = bool((new_occupied != occupied).any())
+        occupied[...] = new_occupied
+        return changed
+
+    def run(self):
+        while self._step():
+            pass
 
 
 if __name__ == "__main__":
@@ -111,7 +250,15 @@ if __name__ == "__main__":
     map.run()
     assert map.occupied_seats == 2247
 
+    dense_map = DenseMap(utils.get_data(11).splitlines())
+    dense_map.run()
+    assert dense_map.occupied_seats == 2247
+
     map2 = Map2(utils.get_data(11).splitlines())
     map2.run()
     assert map2.occupied_seats == 2011
 
+    dense_map2 = DenseMap2(utils.get_data(11).splitlines())
+    dense_map2.run()
+    assert dense_map2.occupied_seats == 2011
+
@@ -1,4 +1,5 @@
-from typing import Dict, List
+from array import array
+from typing import Dict, Generator, Iterable, List, Tuple
 
 import utils
 
@@ -32,9 +33,57 @@ def get_turn(target_turn: int, seed: List[int]) -> int:
     return get_next(curr_turn_index, next_num, cache)
 
 
+def iter_turns(
+    targets: Iterable[int], seed: List[int]
+) -> Generator[Tuple[int, int], None, None]:
+    targets = sorted(set(targets))
+    if not targets:
+        return
+
+    # Every number spoken after the seed is smaller than the turn it is
+    # spoken on, so only seed numbers can fall outside the dense range.
+    dense_limit = targets[-1]
+    last_seen = array('i', [0]) * dense_limit
+    overflow = {}
+    for turn, num in enumerate(seed[:-1], 1):
+        if num < dense_limit:
+            last_seen[num] = turn
+        else:
+            overflow[num] = turn
+
+    last_num = seed[-1]
+    curr_turn = len(seed)
+    for target_turn in targets:
+        if target_turn <= len(seed):
+            yield target_turn, seed[target_turn - 1]
+            continue
+
+        for turn in range(curr_turn, target_turn):
+            if last_num < dense_limit:
+                prev_turn = last_seen[last_num]
+                last_seen[last_num] = turn
+            else:
+                prev_turn = overflow.get(last_num, 0)
+                overflow[last_num] = turn
+            last_num = turn - prev_turn if prev_turn else 0
+        curr_turn = target_turn
+
+        yield target_turn, last_num
+
+
+def get_turns(targets: Iterable[int], seed: List[int]) -> List[int]:
+    targets = list(targets)
+    values = dict(iter_turns(targets, seed))
+    return [values[target_turn] for target_turn in targets]
+
+
+def get_turn_dense(target_turn: int, seed: List[int]) -> int:
+    return get_turns([target_turn], seed)[0]
+
+
 if __name__ == "__main__":
     seed = [
         int(number) for number in utils.get_data(15).split(',')
     ]
     assert get_turn(2020, seed) == 475
-    assert get_turn(30000000, seed) == 11261
\ No newline at end of file
+    assert get_turns([2020, 30000000], seed) == [475, 11261]
\ No newline at end of file
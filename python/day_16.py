@@ -1,15 +1,47 @@
+import bisect
 import dataclasses
 import numpy
 import re
-from typing import Dict, List, Set, Tuple
+from typing import Dict, Iterable, List, Set, Tuple
 
 import utils
 
 
+@dataclasses.dataclass(frozen=True)
+class IntervalSet:
+    # Sorted, merged and inclusive [start, end] intervals.
+    starts: Tuple[int, ...]
+    ends: Tuple[int, ...]
+
+    @classmethod
+    def from_ranges(cls, ranges: Iterable[Tuple[int, int]]) -> 'IntervalSet':
+        starts, ends = [], []
+        for start, end in sorted(ranges):
+            if ends and start <= ends[-1] + 1:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+
+        return cls(tuple(starts), tuple(ends))
+
+    @classmethod
+    def union(cls, *interval_sets: 'IntervalSet') -> 'IntervalSet':
+        return cls.from_ranges(
+            interval
+            for interval_set in interval_sets
+            for interval in zip(interval_set.starts, interval_set.ends)
+        )
+
+    def __contains__(self, value: int) -> bool:
+        index = bisect.bisect_right(self.starts, value) - 1
+        return index >= 0 and value <= self.ends[index]
+
+
 @dataclasses.dataclass(frozen=True)
 class TicketField:
     name: str
-    range: Set[int]
+    range: IntervalSet
 
 
 @dataclasses.dataclass
@@ -28,8 +60,10 @@ def parse_ticket_fields(ticket_field_strs: List[str]) -> List[TicketField]:
         ticket_fields.append(
             TicketField(
                 match.group(1),
-                set(range(int(match.group(2)), int(match.group(3)) + 1))
-                | set(range(int(match.group(4)), int(match.group(5)) + 1))
+                IntervalSet.from_ranges([
+                    (int(match.group(2)), int(match.group(3))),
+                    (int(match.group(4)), int(match.group(5))),
+                ])
             )
         )
 
@@ -106,10 +140,12 @@ def remove_invalid_tickets(
 ) -> Tuple[List[Ticket], int]:
     valid_tickets = []
     error_rate = 0
-    valid_values = set.union(*[field.range for field in ticket_fields])
+    valid_values = IntervalSet.union(*[field.range for field in ticket_fields])
 
     for ticket in tickets:
-        if (invalid_values := set(ticket.fields) - valid_values):
+        if (invalid_values := {
+            value for value in ticket.fields if value not in valid_values
+        }):
             error_rate += sum(invalid_values)
         else:
             valid_tickets.append(ticket)
@@ -117,6 +153,87 @@ def remove_invalid_tickets(
     return valid_tickets, error_rate
 
 
+def parse_ticket_matrix(ticket_strs: List[str]) -> numpy.ndarray:
+    if not ticket_strs:
+        return numpy.zeros((0, 0), dtype=numpy.int64)
+
+    columns = ticket_strs[0].count(',') + 1
+    for ticket_str in ticket_strs:
+        if ticket_str.count(',') + 1 != columns:
+            raise ValueError(
+                f"Ticket {ticket_str!r} does not have {columns} fields"
+            )
+
+    values = numpy.array(",".join(ticket_strs).split(','), dtype=numpy.int64)
+    return values.reshape(len(ticket_strs), columns)
+
+
+def get_field_bounds(
+    ticket_fields: List[TicketField]
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    # (fields, intervals) arrays of inclusive bounds. Fields with fewer
+    # intervals are padded with the empty interval [1, 0].
+    max_intervals = max(len(field.range.starts) for field in ticket_fields)
+    starts = numpy.ones((len(ticket_fields), max_intervals), dtype=numpy.int64)
+    ends = numpy.zeros((len(ticket_fields), max_intervals), dtype=numpy.int64)
+    for index, field in enumerate(ticket_fields):
+        starts[index, :len(field.range.starts)] = field.range.starts
+        ends[index, :len(field.range.ends)] = field.range.ends
+
+    return starts, ends
+
+
+def validate_ticket_matrix(
+    ticket_fields: List[TicketField],
+    tickets: numpy.ndarray,
+    chunk_size: int = 100000,
+) -> Tuple[numpy.ndarray, int]:
+    starts, ends = get_field_bounds(ticket_fields)
+    candidates = numpy.ones(
+        (len(ticket_fields), tickets.shape[1]), dtype=bool
+    )
+    error_rate = 0
+
+    for chunk_start in range(0, len(tickets), chunk_size):
+        chunk = tickets[chunk_start:chunk_start + chunk_size]
+        values = numpy.ascontiguousarray(chunk.T)
+        # (fields, columns, tickets): value fits one of the field's intervals.
+        # Looping over the bounds keeps temporaries at (columns, tickets).
+        valid = numpy.zeros((len(ticket_fields),) + values.shape, dtype=bool)
+        for field_valid, field_starts, field_ends in zip(valid, starts, ends):
+            for start, end in zip(field_starts, field_ends):
+                field_valid |= (values >= start) & (values <= end)
+
+        invalid_values = ~valid.any(axis=0).T
+        valid_tickets = ~invalid_values.any(axis=1)
+        candidates &= valid[:, :, valid_tickets].all(axis=2)
+
+        # Invalid values are counted once per ticket, like the set-based
+        # remove_invalid_tickets.
+        invalid = numpy.sort(numpy.where(invalid_values, chunk, 0), axis=1)
+        error_rate += int(invalid[:, 0].sum()) + int(
+            invalid[:, 1:][invalid[:, 1:] != invalid[:, :-1]].sum()
+        )
+
+    return candidates, error_rate
+
+
+def find_fields_matrix(
+    ticket_fields: List[TicketField],
+    tickets: numpy.ndarray,
+    chunk_size: int = 100000,
+) -> Tuple[Dict[str, int], int]:
+    candidates, error_rate = validate_ticket_matrix(
+        ticket_fields, tickets, chunk_size
+    )
+    field_to_index = {
+        field.name: set(numpy.flatnonzero(field_candidates).tolist())
+        for field, field_candidates in zip(ticket_fields, candidates)
+    }
+
+    return find_one_to_one_mapping(field_to_index), error_rate
+
+
 if __name__ == "__main__":
     ticket_fields, your_ticket, nearby_tickets = parse_input()
 
@@ -133,4 +250,11 @@ if __name__ == "__main__":
                 if field.startswith("departure")
             )
         )
-    ) == 3902565915559
\ No newline at end of file
+    ) == 3902565915559
+
+    nearby_ticket_strs = utils.get_data(16).split("\n\n")[2].splitlines()[1:]
+    matrix_field_map, matrix_error_rate = find_fields_matrix(
+        ticket_fields, parse_ticket_matrix(nearby_ticket_strs), chunk_size=50
+    )
+    assert matrix_error_rate == 25788
+    assert matrix_field_map == field_map
\ No newline at end of file
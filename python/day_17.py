@@ -1,6 +1,9 @@
 import copy
 import dataclasses
+from collections import Counter
 import itertools
+import math
+import numpy
 from typing import Generator, List
 
 import utils
@@ -76,6 +79,125 @@ class PocketD:
         self._active = new_active
 
 
+class DensePocket:
+    def __init__(self, start: List[List[str]], dimensions: int):
+        plane = numpy.array(
+            [[point == "#" for point in row] for row in start], dtype=bool
+        )
+        self._active = plane.reshape(plane.shape + (1,) * (dimensions - 2))
+        self._active = self._crop(self._active)
+
+    @staticmethod
+    def _crop(active: numpy.ndarray) -> numpy.ndarray:
+        if not active.any():
+            return active[tuple(slice(0, 0) for _ in active.shape)]
+
+        bounds = []
+        for axis in range(active.ndim):
+            other_axes = tuple(i for i in range(active.ndim) if i != axis)
+            occupied = numpy.flatnonzero(active.any(axis=other_axes))
+            bounds.append(slice(occupied[0], occupied[-1] + 1))
+        return active[tuple(bounds)]
+
+    @property
+    def active_cubes(self) -> int:
+        return int(self._active.sum())
+
+    def step(self):
+        # Pad by two so the box sum below yields counts for every cell within
+        # one of the current bounding box.
+        counts = numpy.pad(self._active, 2).astype(numpy.uint16)
+        for axis in range(counts.ndim):
+            window = [slice(None)] * counts.ndim
+            box_sum = 0
+            for offset in range(3):
+                window[axis] = slice(offset, counts.shape[axis] - 2 + offset)
+                box_sum = box_sum + counts[tuple(window)]
+            counts = box_sum
+
+        # The box sum includes the cell itself.
+        active = numpy.pad(self._active, 1)
+        self._active = self._crop(
+            (counts == 3) | (active & (counts == 4))
+        )
+
+
+class SymmetricPocket:
+    # The start lies in the plane where every coordinate past x and y is 0,
+    # so the state is invariant under sign flips and permutations of those
+    # extra coordinates. Only the canonical point of each orbit (extra
+    # coordinates non-negative and sorted) is stored.
+    def __init__(self, start: List[List[str]], dimensions: int):
+        self._extra_dimensions = dimensions - 2
+        self._extra_neighbours = {}
+        self._active = {
+            (x, y) + (0,) * self._extra_dimensions
+            for y, row in enumerate(start)
+            for x, point in enumerate(row)
+            if point == "#"
+        }
+
+    def _get_extra_neighbours(self, extras: tuple) -> Counter:
+        # Canonical extra coordinates reachable from extras, with how many of
+        # the 3^k offsets (including the zero offset) land on each.
+        if extras not in self._extra_neighbours:
+            self._extra_neighbours[extras] = Counter(
+                tuple(sorted(
+                    abs(coord + delta) for coord, delta in zip(extras, deltas)
+                ))
+                for deltas in itertools.product(
+                    [-1, 0, 1], repeat=self._extra_dimensions
+                )
+            )
+        return self._extra_neighbours[extras]
+
+    @staticmethod
+    def _orbit_size(point: tuple) -> int:
+        extras = point[2:]
+        size = math.factorial(len(extras)) * 2 ** sum(
+            coord != 0 for coord in extras
+        )
+        for repeats in Counter(extras).values():
+            size //= math.factorial(repeats)
+        return size
+
+    @property
+    def active_cubes(self) -> int:
+        return sum(self._orbit_size(point) for point in self._active)
+
+    def step(self):
+        # Counting (active, neighbour) pairs between two orbits from either
+        # side gives |orbit(p)| * hits(p -> c) == |orbit(c)| * hits(c <- p),
+        # so weighting by the source orbit and dividing by the target orbit
+        # recovers each canonical cell's true neighbour count.
+        weighted = Counter()
+        for point in self._active:
+            weight = self._orbit_size(point)
+            x, y, *extras = point
+            extras = tuple(extras)
+            for neighbour_extras, count in self._get_extra_neighbours(
+                extras
+            ).items():
+                for dx, dy in itertools.product([-1, 0, 1], repeat=2):
+                    hits = count
+                    if dx == dy == 0 and neighbour_extras == extras:
+                        # Drop the zero offset, a point is not its own
+                        # neighbour.
+                        hits -= 1
+                    if hits:
+                        weighted[(x + dx, y + dy) + neighbour_extras] += (
+                            weight * hits
+                        )
+
+        new_active = set()
+        for point, weight in weighted.items():
+            active = weight // self._orbit_size(point)
+            if active == 3 or (active == 2 and point in self._active):
+                new_active.add(point)
+
+        self._active = new_active
+
+
 def run(time: int):
     energy_source = PocketD(
         [
@@ -90,9 +212,35 @@ def run(time: int):
     return energy_source.active_cubes
 
 
+def run_dense(time: int, dimensions: int) -> int:
+    energy_source = DensePocket(utils.get_data(17).splitlines(), dimensions)
+
+    for _ in range(time):
+        energy_source.step()
+
+    return energy_source.active_cubes
+
+
+def run_symmetric(time: int, dimensions: int) -> int:
+    energy_source = SymmetricPocket(
+        utils.get_data(17).splitlines(), dimensions
+    )
+
+    for _ in range(time):
+        energy_source.step()
+
+    return energy_source.active_cubes
+
+
 if __name__ == "__main__":
     DIMENSIONS = 3
     assert run(6) == 333
 
     DIMENSIONS = 4
-    assert run(6) == 2676
\ No newline at end of file
+    assert run(6) == 2676
+
+    assert run_dense(6, 3) == 333
+    assert run_dense(6, 4) == 2676
+
+    assert run_symmetric(6, 3) == 333
+    assert run_symmetric(6, 4) == 2676
\ No newline at end of file
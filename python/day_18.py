@@ -1,6 +1,9 @@
 import dataclasses
 import numpy
-from typing import List, Optional, Tuple, Union
+import operator
+import os
+import re
+from typing import Dict, List, Tuple, Union
 
 import utils
 
@@ -10,10 +13,7 @@ class SyntaxNode:
     _value: Union[int, 'SyntaxTree']
 
     def evaluate(self) -> int:
-        if isinstance(self._value, int):
-            return self._value
-        assert isinstance(self._value, SyntaxTree)
-        return self._value.evaluate()
+        return evaluate_tree(self)
 
 
 @dataclasses.dataclass
@@ -26,76 +26,192 @@ class SyntaxTree:
         return self
 
     def evaluate(self) -> int:
-        if self._node == '+':
-            return self._children[0].evaluate() + self._children[1].evaluate()
-        return self._children[0].evaluate() * self._children[1].evaluate()
-
-
-class SyntaxTree2(SyntaxTree):
-    def add_to(self, equation: Union[SyntaxNode, SyntaxTree]):
-        if isinstance(equation, SyntaxTree) and self._node == '+':
-            self._children = [equation._children[1]] + self._children
-            equation._children[1] = self
-            return equation
-
-        self._children = [equation] + self._children
-        return self
-
-
-def parse_equation(eq_str: str) -> Tuple[SyntaxTree, str]:
-    equation, remaining_str = parse_next_operation(eq_str)
-
-    while remaining_str:
-        node, remaining_str = parse_next_operation(
-            remaining_str
+        return evaluate_tree(self)
+
+
+def evaluate_tree(equation: Union[SyntaxNode, SyntaxTree]) -> int:
+    # Post-order walk with an explicit stack, so long left-deep chains of
+    # equal-precedence operators don't hit the recursion limit.
+    values = []
+    to_visit = [(equation, False)]
+    while to_visit:
+        node, children_done = to_visit.pop()
+        if isinstance(node, SyntaxNode):
+            if isinstance(node._value, int):
+                values.append(node._value)
+            else:
+                to_visit.append((node._value, False))
+        elif children_done:
+            right = values.pop()
+            left = values.pop()
+            values.append(left + right if node._node == '+' else left * right)
+        else:
+            to_visit.append((node, True))
+            to_visit.append((node._children[1], False))
+            to_visit.append((node._children[0], False))
+
+    return values[0]
+
+
+PRECEDENCE = {'+': 1, '*': 1}
+ADDITION_FIRST_PRECEDENCE = {'+': 2, '*': 1}
+
+TOKEN_REGEX = re.compile(r"\s*(?:(\d+)|(.))")
+
+
+def tokenize(eq_str: str) -> List[Union[int, str]]:
+    tokens = []
+    for match in TOKEN_REGEX.finditer(eq_str.rstrip()):
+        number, symbol = match.groups()
+        if number is not None:
+            tokens.append(int(number))
+        elif symbol in "+*()":
+            tokens.append(symbol)
+        else:
+            raise ValueError(f"Unexpected character {symbol!r} in {eq_str!r}")
+    return tokens
+
+
+def parse_operand(
+    tokens: List[Union[int, str]], index: int, precedence: Dict[str, int]
+) -> Tuple[SyntaxNode, int]:
+    if index >= len(tokens):
+        raise ValueError("Unexpected end of equation")
+
+    token = tokens[index]
+    if isinstance(token, int):
+        return SyntaxNode(token), index + 1
+
+    if token != '(':
+        raise ValueError(f"Unexpected token {token!r} at {index}")
+
+    child, index = parse_operations(tokens, index + 1, precedence, 0)
+    if index >= len(tokens) or tokens[index] != ')':
+        raise ValueError(f"Missing ')' at {index}")
+    if isinstance(child, SyntaxNode):
+        return child, index + 1
+    return SyntaxNode(child), index + 1
+
+
+def parse_operations(
+    tokens: List[Union[int, str]],
+    index: int,
+    precedence: Dict[str, int],
+    min_precedence: int,
+) -> Tuple[Union[SyntaxNode, SyntaxTree], int]:
+    # Precedence climbing: operators binding tighter than min_precedence are
+    # folded into the right operand, equal ones associate to the left.
+    equation, index = parse_operand(tokens, index, precedence)
+
+    while index < len(tokens) and tokens[index] in precedence:
+        op = tokens[index]
+        if precedence[op] < min_precedence:
+            break
+
+        right, index = parse_operations(
+            tokens, index + 1, precedence, precedence[op] + 1
+        )
+        equation = SyntaxTree(op, [equation, right])
+
+    return equation, index
+
+
+def parse_equation(
+    eq_str: str, precedence: Dict[str, int] = PRECEDENCE
+) -> Union[SyntaxNode, SyntaxTree]:
+    tokens = tokenize(eq_str)
+    equation, index = parse_operations(tokens, 0, precedence, 0)
+    if index != len(tokens):
+        raise ValueError(f"Unexpected token {tokens[index]!r} at {index}")
+    return equation
+
+
+OPERATORS = {'+': operator.add, '*': operator.mul}
+
+
+def compile_equation(
+    eq_str: str, precedence: Dict[str, int] = PRECEDENCE
+) -> List[Union[int, str]]:
+    # Shunting-yard straight from the tokens into a postfix program.
+    program = []
+    ops = []
+    # Operands and '(' must come where an operand is expected, operators and
+    # ')' where one has just ended.
+    expect_operand = True
+    for index, token in enumerate(tokenize(eq_str)):
+        if expect_operand != (isinstance(token, int) or token == '('):
+            raise ValueError(f"Unexpected token {token!r} at {index}")
+
+        if isinstance(token, int):
+            program.append(token)
+            expect_operand = False
+        elif token == '(':
+            ops.append(token)
+        elif token == ')':
+            while ops and ops[-1] != '(':
+                program.append(ops.pop())
+            if not ops:
+                raise ValueError(f"Unmatched ')' in {eq_str!r}")
+            ops.pop()
+        else:
+            while (
+                ops and ops[-1] != '('
+                and precedence[ops[-1]] >= precedence[token]
+            ):
+                program.append(ops.pop())
+            ops.append(token)
+            expect_operand = True
+
+    if expect_operand:
+        raise ValueError("Unexpected end of equation")
+
+    while ops:
+        op = ops.pop()
+        if op == '(':
+            raise ValueError(f"Unmatched '(' in {eq_str!r}")
+        program.append(op)
+
+    return program
+
+
+def evaluate_program(program: List[Union[int, str]]) -> int:
+    stack = []
+    for token in program:
+        if isinstance(token, int):
+            stack.append(token)
+        else:
+            if len(stack) < 2:
+                raise ValueError(f"Malformed program {program!r}")
+            right = stack.pop()
+            stack.append(OPERATORS[token](stack.pop(), right))
+
+    if len(stack) != 1:
+        raise ValueError(f"Malformed program {program!r}")
+    return stack[0]
+
+
+def evaluate_file(path: str, precedence: Dict[str, int] = PRECEDENCE) -> int:
+    with open(path) as f:
+        return sum(
+            evaluate_program(compile_equation(line, precedence))
+            for line in f
+            if line.strip()
         )
-        if node is None:
-            return equation, remaining_str
-
-        equation = node.add_to(equation)
-
-    return equation, ""
-
-
-def parse_next_operation(eq_str: str) -> Tuple[Optional[SyntaxTree], str]:
-    remaining_str = eq_str
-    child = None
-    op = None
-
-    while child is None:
-        next_char, *remaining_str = remaining_str
-
-        if next_char.isspace():
-            continue
-
-        if next_char == '(':
-            child, remaining_str = parse_equation(remaining_str)
-            child = SyntaxNode(child)
-        elif next_char == ')':
-            return None, remaining_str
-
-        elif next_char.isdigit():
-            child = SyntaxNode(int(next_char))
-        elif next_char in ['+', '*']:
-            op = next_char
-
-    if op is None:
-        return child, remaining_str
-
-    return Tree(op, [child,]), remaining_str
 
 
 if __name__ == "__main__":
-    Tree = SyntaxTree
     equations = [
-        parse_equation(equation)[0]
+        parse_equation(equation)
         for equation in utils.get_data(18).splitlines()
     ]
     assert sum(equation.evaluate() for equation in equations) == 75592527415659
 
-    Tree = SyntaxTree2
     equations = [
-        parse_equation(equation)[0]
+        parse_equation(equation, ADDITION_FIRST_PRECEDENCE)
         for equation in utils.get_data(18).splitlines()
     ]
-    assert sum(equation.evaluate() for equation in equations) == 360029542265462
\ No newline at end of file
+    assert sum(equation.evaluate() for equation in equations) == 360029542265462
+
+    path = os.path.join(utils.DATA_DIR, "day_18.txt")
+    assert evaluate_file(path) == 75592527415659
+    assert evaluate_file(path, ADDITION_FIRST_PRECEDENCE) == 360029542265462
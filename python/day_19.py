@@ -1,7 +1,11 @@
 from collections import defaultdict
 import itertools
+import math
 import re
-from typing import Dict, List, Optional, Set
+import os
+from typing import (
+    Dict, Generator, Iterable, List, Optional, Pattern, Set, Tuple, Union
+)
 
 import utils
 
@@ -67,6 +71,262 @@ def apply_loop_rules(
     return all(section in starts_with for section in input_sections)
 
 
+Symbol = Union[int, str]
+Grammar = Dict[int, List[Tuple[Symbol, ...]]]
+
+
+def parse_rules(rule_strs: str) -> Grammar:
+    grammar = {}
+    for rule_str in rule_strs.splitlines():
+        rule_id, rule_def = rule_str.split(':')
+        alternatives = []
+        for alternative in rule_def.split(" | "):
+            alternatives.append(tuple(
+                token[1:-1] if token.startswith('"') else int(token)
+                for token in alternative.split()
+            ))
+        grammar[int(rule_id)] = alternatives
+
+    return grammar
+
+
+def matches(input_str: str, grammar: Grammar, start_id: int = 0) -> bool:
+    # Earley recogniser. An item is (rule_id, alternative, dot, origin) and
+    # chart[i] holds the items that are live after reading i characters.
+    chart = [set() for _ in range(len(input_str) + 1)]
+    chart[0] = {
+        (start_id, alt_index, 0, 0)
+        for alt_index in range(len(grammar[start_id]))
+    }
+
+    for index in range(len(input_str) + 1):
+        agenda = list(chart[index])
+        while agenda:
+            rule_id, alt_index, dot, origin = item = agenda.pop()
+            alternative = grammar[rule_id][alt_index]
+
+            if dot == len(alternative):
+                new_items = [
+                    (other_id, other_alt, other_dot + 1, other_origin)
+                    for other_id, other_alt, other_dot, other_origin
+                    in chart[origin]
+                    if other_dot < len(grammar[other_id][other_alt])
+                    and grammar[other_id][other_alt][other_dot] == rule_id
+                ]
+            elif isinstance(symbol := alternative[dot], int):
+                new_items = [
+                    (symbol, symbol_alt, 0, index)
+                    for symbol_alt in range(len(grammar[symbol]))
+                ]
+            else:
+                if input_str.startswith(symbol, index):
+                    chart[index + len(symbol)].add(
+                        (rule_id, alt_index, dot + 1, origin)
+                    )
+                continue
+
+            for new_item in new_items:
+                if new_item not in chart[index]:
+                    chart[index].add(new_item)
+                    agenda.append(new_item)
+
+    return any(
+        (start_id, alt_index, len(alternative), 0) in chart[-1]
+        for alt_index, alternative in enumerate(grammar[start_id])
+    )
+
+
+# Recursive rules are unrolled at most this many times by default. Messages
+# long enough to need deeper nesting are checked with matches() instead.
+MAX_UNROLL_DEPTH = 8
+MAX_PATTERN_LENGTH = 200000
+
+
+def _get_reachable(rule_id: int, grammar: Grammar) -> Set[int]:
+    reachable = set()
+    to_visit = [rule_id]
+    while to_visit:
+        for alternative in grammar[to_visit.pop()]:
+            for symbol in alternative:
+                if isinstance(symbol, int) and symbol not in reachable:
+                    reachable.add(symbol)
+                    to_visit.append(symbol)
+    return reachable
+
+
+def _is_recursive(rule_id: int, grammar: Grammar) -> bool:
+    return rule_id in _get_reachable(rule_id, grammar)
+
+
+def _get_repeated(rule_id: int, grammar: Grammar) -> Optional[Tuple]:
+    # Rules shaped like "8: 42 | 42 8" match one or more copies of the
+    # non-recursive part and compile exactly to (?:...)+.
+    alternatives = grammar[rule_id]
+    if len(alternatives) != 2:
+        return None
+
+    for single, repeated in (alternatives, alternatives[::-1]):
+        if repeated == single + (rule_id,) and not any(
+            isinstance(symbol, int)
+            and rule_id in _get_reachable(symbol, grammar) | {symbol}
+            for symbol in single
+        ):
+            return single
+    return None
+
+
+def get_min_lengths(grammar: Grammar) -> Dict[int, float]:
+    min_lengths = {rule_id: math.inf for rule_id in grammar}
+    changed = True
+    while changed:
+        changed = False
+        for rule_id, alternatives in grammar.items():
+            min_length = min(
+                sum(
+                    len(symbol) if isinstance(symbol, str)
+                    else min_lengths[symbol]
+                    for symbol in alternative
+                )
+                for alternative in alternatives
+            )
+            if min_length < min_lengths[rule_id]:
+                min_lengths[rule_id] = min_length
+                changed = True
+
+    return min_lengths
+
+
+def get_max_exact_length(
+    grammar: Grammar, unrolled: Set[int], max_depth: int
+) -> float:
+    # Longest message for which max_depth nestings of every unrolled rule
+    # are enough. A directly recursive alternative grows the match by at
+    # least its other symbols' minimum lengths per level; indirect
+    # recursion falls back to one character per level, which holds as long
+    # as no rule matches the empty string.
+    min_lengths = get_min_lengths(grammar)
+    max_length = math.inf
+    for rule_id in unrolled:
+        growths = [
+            sum(
+                len(symbol) if isinstance(symbol, str)
+                else min_lengths[symbol]
+                for symbol in alternative
+            ) - min_lengths[rule_id]
+            for alternative in grammar[rule_id]
+            if rule_id in alternative
+        ]
+        growth = min((growth for growth in growths if growth > 0), default=1)
+        max_length = min(
+            max_length, min_lengths[rule_id] + max_depth * growth - 1
+        )
+
+    return max_length
+
+
+def _rule_regex(
+    rule_id: int,
+    grammar: Grammar,
+    max_depth: int,
+    depths: Dict[int, int],
+    cache: Dict[int, str],
+) -> Optional[str]:
+    if rule_id in cache:
+        return cache[rule_id]
+
+    repeated = _get_repeated(rule_id, grammar)
+    recursive = repeated is None and _is_recursive(rule_id, grammar)
+    if recursive:
+        if depths.get(rule_id, 0) >= max_depth:
+            return None
+        depths[rule_id] = depths.get(rule_id, 0) + 1
+
+    alternative_regexes = []
+    for alternative in grammar[rule_id] if repeated is None else [repeated]:
+        parts = []
+        for symbol in alternative:
+            if isinstance(symbol, str):
+                parts.append(re.escape(symbol))
+            elif (part := _rule_regex(
+                symbol, grammar, max_depth, depths, cache
+            )) is not None:
+                parts.append(part)
+            else:
+                break
+        else:
+            alternative_regexes.append("".join(parts))
+
+    if recursive:
+        depths[rule_id] -= 1
+
+    if not alternative_regexes:
+        return None
+
+    regex = "(?:" + "|".join(alternative_regexes) + ")"
+    if repeated is not None:
+        regex = f"(?:{regex})+"
+    if len(regex) > MAX_PATTERN_LENGTH:
+        raise ValueError(
+            f"Rule {rule_id} needs a pattern over {MAX_PATTERN_LENGTH} "
+            "characters, use matches() for this grammar"
+        )
+
+    if not recursive:
+        cache[rule_id] = regex
+    return regex
+
+
+def compile_regex(
+    grammar: Grammar, start_id: int = 0, max_depth: int = MAX_UNROLL_DEPTH
+) -> Tuple[Pattern, float]:
+    # Returns the pattern and the longest message it is exact for. Longer
+    # messages may need deeper nesting than was unrolled.
+    regex = _rule_regex(start_id, grammar, max_depth, {}, {})
+    if regex is None:
+        raise ValueError(f"Rule {start_id} cannot match a finite string")
+
+    unrolled = {
+        rule_id
+        for rule_id in _get_reachable(start_id, grammar) | {start_id}
+        if _get_repeated(rule_id, grammar) is None
+        and _is_recursive(rule_id, grammar)
+    }
+    return (
+        re.compile(regex),
+        get_max_exact_length(grammar, unrolled, max_depth),
+    )
+
+
+def iter_messages(path: str) -> Generator[str, None, None]:
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                break
+        for line in f:
+            yield line.rstrip("\n")
+
+
+def count_matches(pattern: Pattern, messages: Iterable[str]) -> int:
+    return sum(
+        pattern.fullmatch(message) is not None for message in messages
+    )
+
+
+def count_file_matches(
+    grammar: Grammar,
+    path: str,
+    start_id: int = 0,
+    max_depth: int = MAX_UNROLL_DEPTH,
+) -> int:
+    pattern, max_length = compile_regex(grammar, start_id, max_depth)
+    return sum(
+        pattern.fullmatch(message) is not None
+        if len(message) <= max_length
+        else matches(message, grammar, start_id)
+        for message in iter_messages(path)
+    )
+
+
 if __name__ == "__main__":
     rule_strs, input_strs, *_ = utils.get_data(19).split("\n\n")
 
@@ -82,4 +342,19 @@ if __name__ == "__main__":
     assert sum(
         apply_loop_rules(input_str, rules[42], rules[31])
         for input_str in input_strs.splitlines()
-    ) == 409
\ No newline at end of file
+    ) == 409
+
+    grammar = parse_rules(rule_strs)
+    assert sum(
+        matches(input_str, grammar) for input_str in input_strs.splitlines()
+    ) == 291
+
+    path = os.path.join(utils.DATA_DIR, "day_19.txt")
+    assert count_file_matches(grammar, path) == 291
+
+    grammar[8] = [(42,), (42, 8)]
+    grammar[11] = [(42, 31), (42, 11, 31)]
+    assert sum(
+        matches(input_str, grammar) for input_str in input_strs.splitlines()
+    ) == 409
+    assert count_file_matches(grammar, path) == 409
\ No newline at end of file
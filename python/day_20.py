@@ -2,7 +2,7 @@ from collections import defaultdict, deque
 import dataclasses
 import numpy
 import re
-from typing import Dict, List, Set
+from typing import Dict, List, Set, Tuple, Type, Union
 
 import utils
 
@@ -70,6 +70,98 @@ class Image:
         self._pixels = self._pixels[::-1]
 
 
+class ArrayImage:
+    def __init__(self, tile_id: int, pixels: List[str]):
+        self.tile_id = tile_id
+        self._base = numpy.array([
+            numpy.frombuffer(row.encode(), dtype=numpy.uint8)
+            for row in pixels
+        ])
+        # The current pixels are rot90(base, rotations), with the base
+        # mirrored left-right first when flipped.
+        self._rotations = 0
+        self._flipped = False
+        self._edges: Dict[Tuple[int, bool], Tuple[Edge, Edge, Edge, Edge]] = {}
+        self._edge_bits: Dict[Tuple[int, bool], Tuple[int, int, int, int]] = {}
+
+    @property
+    def array(self) -> numpy.ndarray:
+        base = self._base[:, ::-1] if self._flipped else self._base
+        return numpy.rot90(base, self._rotations)
+
+    @property
+    def pixels(self) -> List[str]:
+        return [row.tobytes().decode() for row in self.array[1:-1, 1:-1]]
+
+    @property
+    def actual_pixels(self) -> List[str]:
+        return [row.tobytes().decode() for row in self.array]
+
+    def _get_edges(self) -> Tuple[Edge, Edge, Edge, Edge]:
+        orientation = (self._rotations, self._flipped)
+        if orientation not in self._edges:
+            array = self.array
+            self._edges[orientation] = tuple(
+                Edge(edge.tobytes().decode())
+                for edge in (array[0], array[-1], array[:, 0], array[:, -1])
+            )
+        return self._edges[orientation]
+
+    @property
+    def orientation(self) -> Tuple[int, bool]:
+        return self._rotations, self._flipped
+
+    @orientation.setter
+    def orientation(self, orientation: Tuple[int, bool]):
+        self._rotations, self._flipped = orientation
+
+    @property
+    def edge_bits(self) -> Tuple[int, int, int, int]:
+        # Top, bottom, left and right edges read as binary numbers with '#'
+        # as 1, in the same direction as the matching Edge strings.
+        if self.orientation not in self._edge_bits:
+            array = self.array == ord('#')
+            powers = 1 << numpy.arange(array.shape[0] - 1, -1, -1)
+            self._edge_bits[self.orientation] = tuple(
+                int(edge @ powers)
+                for edge in (array[0], array[-1], array[:, 0], array[:, -1])
+            )
+        return self._edge_bits[self.orientation]
+
+    @property
+    def edges(self) -> Set[Edge]:
+        return set(self._get_edges())
+
+    @property
+    def top(self) -> Edge:
+        return self._get_edges()[0]
+
+    @property
+    def bottom(self) -> Edge:
+        return self._get_edges()[1]
+
+    @property
+    def left(self) -> Edge:
+        return self._get_edges()[2]
+
+    @property
+    def right(self) -> Edge:
+        return self._get_edges()[3]
+
+    def rotate(self):
+        self._rotations = (self._rotations + 1) % 4
+
+    def flip_x(self):
+        # fliplr(rot90(B, r)) == rot90(fliplr(B), -r)
+        self._flipped = not self._flipped
+        self._rotations = -self._rotations % 4
+
+    def flip_y(self):
+        # flipud(rot90(B, r)) == rot90(fliplr(B), 2 - r)
+        self._flipped = not self._flipped
+        self._rotations = (2 - self._rotations) % 4
+
+
 @dataclasses.dataclass
 class Tiles:
     edge_to_tile: Dict[Edge, Image]
@@ -102,17 +194,116 @@ class Tiles:
             yield tile
 
 
-def parse_image(input_str: List[str]) -> Image:
+ORIENTATIONS = [
+    (rotations, flipped) for flipped in (False, True) for rotations in range(4)
+]
+
+
+def build_reverse_table(width: int) -> List[int]:
+    reverse_table = [0] * (1 << width)
+    for bits in range(1, 1 << width):
+        reverse_table[bits] = (reverse_table[bits >> 1] >> 1) | (
+            (bits & 1) << (width - 1)
+        )
+    return reverse_table
+
+
+class EdgeIndex:
+    TOP, BOTTOM, LEFT, RIGHT = range(4)
+
+    def __init__(self, tiles: List[ArrayImage]):
+        self.id_to_tile = {tile.tile_id: tile for tile in tiles}
+        self._reverse = build_reverse_table(len(tiles[0].actual_pixels))
+        self.canonical_to_tiles: Dict[int, List[int]] = defaultdict(list)
+        # For each tile, the orientation that puts a given exact edge at the
+        # top or at the left.
+        self._top_orientation: Dict[int, Dict[int, Tuple[int, bool]]] = {}
+        self._left_orientation: Dict[int, Dict[int, Tuple[int, bool]]] = {}
+
+        for tile in tiles:
+            starting_orientation = tile.orientation
+            top_orientation = self._top_orientation[tile.tile_id] = {}
+            left_orientation = self._left_orientation[tile.tile_id] = {}
+            for orientation in ORIENTATIONS:
+                tile.orientation = orientation
+                edge_bits = tile.edge_bits
+                top_orientation.setdefault(edge_bits[self.TOP], orientation)
+                left_orientation.setdefault(edge_bits[self.LEFT], orientation)
+            tile.orientation = starting_orientation
+
+            for bits in top_orientation:
+                if bits <= self._reverse[bits]:
+                    self.canonical_to_tiles[bits].append(tile.tile_id)
+
+    def canonical(self, bits: int) -> int:
+        return min(bits, self._reverse[bits])
+
+    def is_image_edge(self, bits: int) -> bool:
+        return len(self.canonical_to_tiles[self.canonical(bits)]) == 1
+
+    def is_corner(self, tile: ArrayImage) -> bool:
+        return sum(self.is_image_edge(bits) for bits in tile.edge_bits) == 2
+
+    def _get_neighbour(self, tile: ArrayImage, bits: int) -> ArrayImage:
+        tile_ids = self.canonical_to_tiles[self.canonical(bits)]
+        other_id = tile_ids[0] if tile_ids[0] != tile.tile_id else tile_ids[1]
+        return self.id_to_tile[other_id]
+
+    def get_next_right(self, tile: ArrayImage) -> ArrayImage:
+        bits = tile.edge_bits[self.RIGHT]
+        next_tile = self._get_neighbour(tile, bits)
+        next_tile.orientation = self._left_orientation[next_tile.tile_id][bits]
+        return next_tile
+
+    def get_next_below(self, tile: ArrayImage) -> ArrayImage:
+        bits = tile.edge_bits[self.BOTTOM]
+        next_tile = self._get_neighbour(tile, bits)
+        next_tile.orientation = self._top_orientation[next_tile.tile_id][bits]
+        return next_tile
+
+    def __iter__(self):
+        for tile in self.id_to_tile.values():
+            yield tile
+
+
+def build_image_indexed(index: EdgeIndex) -> List[List[ArrayImage]]:
+    corner = next(tile for tile in index if index.is_corner(tile))
+    # Same orientation get_corner picks: rotate until the top is an image
+    # edge, then mirror if the left is not.
+    while not index.is_image_edge(corner.edge_bits[index.TOP]):
+        corner.rotate()
+    if not index.is_image_edge(corner.edge_bits[index.LEFT]):
+        corner.flip_x()
+
+    column = [corner]
+    while not index.is_image_edge(column[-1].edge_bits[index.BOTTOM]):
+        column.append(index.get_next_below(column[-1]))
+
+    images = []
+    for tile in column:
+        row = [tile]
+        while not index.is_image_edge(row[-1].edge_bits[index.RIGHT]):
+            row.append(index.get_next_right(row[-1]))
+        images.append(row)
+
+    return images
+
+
+def parse_image(
+    input_str: List[str], image_type: Type[Union[Image, ArrayImage]] = Image
+) -> Union[Image, ArrayImage]:
     tile_id_str, *tile_str = input_str.splitlines()
     tile_id = int(re.match(r"Tile ([0-9]*):", tile_id_str).group(1))
 
-    return Image(tile_id, tile_str)
+    return image_type(tile_id, tile_str)
 
 
-def parse_tiles() -> Tiles:
+def parse_tiles(
+    image_type: Type[Union[Image, ArrayImage]] = Image
+) -> Tiles:
     tile_strs = utils.get_data(20).split("\n\n")
 
-    tiles = [parse_image(tile_str) for tile_str in tile_strs]
+    tiles = [parse_image(tile_str, image_type) for tile_str in tile_strs]
 
     id_to_tile = {
         tile.tile_id: tile for tile in tiles
@@ -194,6 +385,85 @@ def combine_images(images: List[List[Image]]) -> List[str]:
     return Image(0, final_image)
 
 
+SEA_MONSTER = [
+    "                  # ",
+    "#    ##    ##    ###",
+    " #  #  #  #  #  #   ",
+]
+
+
+def _correlate(
+    image: numpy.ndarray, mask: numpy.ndarray, method: str
+) -> numpy.ndarray:
+    # True at (row, col) when every set cell of mask lands on a set cell of
+    # image with the mask's top left corner at (row, col).
+    height, width = image.shape
+    mask_height, mask_width = mask.shape
+    out_shape = (height - mask_height + 1, width - mask_width + 1)
+    if method == "auto":
+        method = "fft" if mask.sum() > 64 else "shift"
+
+    if method == "fft":
+        correlation = numpy.fft.irfft2(
+            numpy.fft.rfft2(image, s=image.shape)
+            * numpy.conj(numpy.fft.rfft2(mask, s=image.shape)),
+            s=image.shape,
+        )
+        return numpy.rint(
+            correlation[:out_shape[0], :out_shape[1]]
+        ) == mask.sum()
+
+    if method != "shift":
+        raise ValueError(f"Unknown method {method!r}")
+
+    matches = numpy.ones(out_shape, dtype=bool)
+    for row, col in zip(*numpy.nonzero(mask)):
+        matches &= image[row:row + out_shape[0], col:col + out_shape[1]]
+    return matches
+
+
+def find_sea_monsters_all(
+    image: Union[Image, ArrayImage],
+    pattern: List[str] = SEA_MONSTER,
+    method: str = "auto",
+) -> Tuple[List[Tuple[int, int, Tuple[int, bool]]], int]:
+    pixels = numpy.array([
+        numpy.frombuffer(row.encode(), dtype=numpy.uint8)
+        for row in image.actual_pixels
+    ]) == ord('#')
+    base_mask = numpy.array([
+        numpy.frombuffer(row.encode(), dtype=numpy.uint8) for row in pattern
+    ]) == ord('#')
+
+    # Orient the mask rather than the image so matches are reported in the
+    # image's own coordinates, alongside the mask orientation that hit.
+    matches = []
+    monster_cells = numpy.zeros(pixels.shape, dtype=bool)
+    seen_masks = set()
+    for rotations, flipped in ORIENTATIONS:
+        mask = numpy.rot90(
+            base_mask[:, ::-1] if flipped else base_mask, rotations
+        )
+        if mask.shape[0] > pixels.shape[0] or mask.shape[1] > pixels.shape[1]:
+            continue
+        mask_key = (mask.shape, mask.tobytes())
+        if mask_key in seen_masks:
+            continue
+        seen_masks.add(mask_key)
+
+        hits = _correlate(pixels, mask, method)
+        matches.extend(
+            (int(row), int(col), (rotations, flipped))
+            for row, col in zip(*numpy.nonzero(hits))
+        )
+        for row, col in zip(*numpy.nonzero(mask)):
+            monster_cells[
+                row:row + hits.shape[0], col:col + hits.shape[1]
+            ] |= hits
+
+    return matches, int((pixels & ~monster_cells).sum())
+
+
 def find_sea_monsters(image: Image) -> int:
     sea_monster = (
         "                  # \n"
@@ -227,4 +497,25 @@ if __name__ == "__main__":
 
     final_image = combine_images(images)
 
-    assert find_sea_monsters(final_image) == 2065
\ No newline at end of file
+    assert find_sea_monsters(final_image) == 2065
+
+    images = build_image(parse_tiles(ArrayImage))
+    assert [
+        [image.tile_id for image in row] for row in images
+    ] == [
+        [image.tile_id for image in row] for row in build_image(parse_tiles())
+    ]
+    assert find_sea_monsters(combine_images(images)) == 2065
+
+    index = EdgeIndex(list(parse_tiles(ArrayImage)))
+    indexed_images = build_image_indexed(index)
+    assert [
+        [image.tile_id for image in row] for row in indexed_images
+    ] == [
+        [image.tile_id for image in row] for row in images
+    ]
+    assert find_sea_monsters(combine_images(indexed_images)) == 2065
+
+    matches, roughness = find_sea_monsters_all(final_image)
+    assert roughness == 2065
+    assert find_sea_monsters_all(final_image, method="fft")[0] == matches
\ No newline at end of file
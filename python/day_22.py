@@ -1,28 +1,139 @@
-from collections import deque
+from array import array
+from collections import OrderedDict
 import copy
-from typing import List, Tuple
+from typing import Generator, Iterable, List, Optional, Tuple, Union
 
 import utils
 
 
+HASH_MODULUS = 2 ** 61 - 1
+HASH_BASE = 1000003
+HASH_BASE_INVERSE = pow(HASH_BASE, -1, HASH_MODULUS)
+
+
+class Deck:
+    def __init__(self, cards: Iterable[int], capacity: Optional[int] = None):
+        cards = array('I', cards)
+        if capacity is None or capacity < len(cards):
+            capacity = len(cards)
+
+        self._cards = cards + array('I', [0]) * (capacity - len(cards))
+        self._start = 0
+        self._len = len(cards)
+
+    def _ordered(self) -> array:
+        end = self._start + self._len
+        if end <= len(self._cards):
+            return self._cards[self._start:end]
+        return (
+            self._cards[self._start:]
+            + self._cards[:end - len(self._cards)]
+        )
+
+    def popleft(self) -> int:
+        if not self._len:
+            raise IndexError("pop from an empty deck")
+
+        card = self._cards[self._start]
+        self._start += 1
+        if self._start == len(self._cards):
+            self._start = 0
+        self._len -= 1
+        return card
+
+    def append(self, card: int):
+        if self._len == len(self._cards):
+            # Only reached when the deck was built without enough capacity.
+            self._cards = self._ordered() + array('I', [0]) * max(self._len, 1)
+            self._start = 0
+
+        end = self._start + self._len
+        if end >= len(self._cards):
+            end -= len(self._cards)
+        self._cards[end] = card
+        self._len += 1
+
+    def extend(self, cards: Iterable[int]):
+        for card in cards:
+            self.append(card)
+
+    def prefix(self, count: int, capacity: Optional[int] = None) -> 'Deck':
+        end = self._start + count
+        if end <= len(self._cards):
+            cards = self._cards[self._start:end]
+        else:
+            cards = (
+                self._cards[self._start:]
+                + self._cards[:end - len(self._cards)]
+            )
+        return Deck(cards, capacity)
+
+    def to_bytes(self) -> bytes:
+        return self._ordered().tobytes()
+
+    @property
+    def score(self) -> int:
+        cards = self._cards
+        index = self._start
+        total = 0
+        for weight in range(self._len, 0, -1):
+            total += weight * cards[index]
+            index += 1
+            if index == len(cards):
+                index = 0
+        return total
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Generator[int, None, None]:
+        index = self._start
+        for _ in range(self._len):
+            yield self._cards[index]
+            index += 1
+            if index == len(self._cards):
+                index = 0
+
+
 class Player:
-    def __init__(self, player_id: int, cards: List[int]):
+    def __init__(
+        self,
+        player_id: int,
+        cards: Union[List[int], Deck],
+        capacity: Optional[int] = None,
+    ):
         self.player_id = player_id
-        self.cards = deque(cards)
+        if isinstance(cards, Deck):
+            self.cards = cards
+        else:
+            self.cards = Deck(cards, capacity)
+
+        # Polynomial hash of the deck, with the top card holding the highest
+        # power of HASH_BASE so both ends can be updated in O(1).
+        self.state = 0
+        self._top_power = HASH_BASE_INVERSE
+        for card in cards:
+            self._push_hash(card)
+
+    def _push_hash(self, card: int):
+        self.state = (self.state * HASH_BASE + card) % HASH_MODULUS
+        self._top_power = (self._top_power * HASH_BASE) % HASH_MODULUS
 
     @property
     def next_card(self) -> int:
-        return self.cards.popleft()
+        card = self.cards.popleft()
+        self.state = (self.state - card * self._top_power) % HASH_MODULUS
+        self._top_power = (self._top_power * HASH_BASE_INVERSE) % HASH_MODULUS
+        return card
 
     @property
     def score(self) -> int:
-        return sum(
-            (index+1) * card
-            for index, card in enumerate(list(self.cards)[::-1])
-        )
+        return self.cards.score
 
     def wins(self, *cards):
         self.cards.extend(cards)
+        for card in cards:
+            self._push_hash(card)
 
     def __bool__(self) -> bool:
         return bool(self.cards)
@@ -31,18 +142,23 @@ class Player:
         return f"Player_{self.player_id}:{','.join(str(card) for card in self.cards)}"
 
 
-def parse_player(player_id: int, player_cards: List[str]) -> Player:
+def parse_player(
+    player_id: int, player_cards: List[str], capacity: Optional[int] = None
+) -> Player:
     cards = [int(card) for card in player_cards]
 
-    return Player(player_id, cards)
+    return Player(player_id, cards, capacity)
 
 
 def parse_players() -> Tuple[Player, Player]:
     player_1_str, player_2_str = utils.get_data(22).split("\n\n")
+    player_1_cards = player_1_str.splitlines()[1:]
+    player_2_cards = player_2_str.splitlines()[1:]
+    capacity = len(player_1_cards) + len(player_2_cards)
 
     return (
-        parse_player(1, player_1_str.splitlines()[1:]),
-        parse_player(2, player_2_str.splitlines()[1:])
+        parse_player(1, player_1_cards, capacity),
+        parse_player(2, player_2_cards, capacity)
     )
 
 
@@ -61,11 +177,62 @@ def play_once(player_1: Player, player_2: Player) -> int:
     return player_2.score
 
 
-def play_recursive(player_1: Player, player_2: Player) -> Player:
+DeckPair = Tuple[bytes, bytes]
+
+
+class SubGameCache:
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._winners = OrderedDict()
+
+    def get(self, key: DeckPair) -> Optional[int]:
+        try:
+            winner_id = self._winners[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self._winners.move_to_end(key)
+        self.hits += 1
+        return winner_id
+
+    def add(self, key: DeckPair, winner_id: int):
+        self._winners[key] = winner_id
+        if len(self._winners) > self.max_size:
+            self._winners.popitem(last=False)
+
+
+def play_sub_game(cards_1: Deck, cards_2: Deck, cache: SubGameCache) -> int:
+    # The highest card can only be lost by recursing on it, which needs at
+    # least that many other cards in its holder's deck. If player 1 holds it
+    # and it is too high to ever recurse, player 1 can never run out.
+    highest_card = max(max(cards_1), max(cards_2))
+    total_cards = len(cards_1) + len(cards_2)
+    if highest_card in cards_1 and highest_card > total_cards - 2:
+        return 1
+
+    key = (cards_1.to_bytes(), cards_2.to_bytes())
+    winner_id = cache.get(key)
+    if winner_id is None:
+        winner_id = play_recursive(
+            Player(1, cards_1), Player(2, cards_2), cache
+        ).player_id
+        cache.add(key, winner_id)
+
+    return winner_id
+
+
+def play_recursive(
+    player_1: Player, player_2: Player, cache: Optional[SubGameCache] = None
+) -> Player:
+    if cache is None:
+        cache = SubGameCache()
     combinations = set()
 
     while player_1 and player_2:
-        combo = str(player_1) + str(player_2)
+        combo = (len(player_1.cards), player_1.state, player_2.state)
         if combo in combinations:
             return player_1
         else:
@@ -75,10 +242,12 @@ def play_recursive(player_1: Player, player_2: Player) -> Player:
         card_2 = player_2.next_card
 
         if card_1 <= len(player_1.cards) and card_2 <= len(player_2.cards):
-            winner = play_recursive(
-                Player(1, list(player_1.cards)[:card_1]),
-                Player(2, list(player_2.cards)[:card_2])
+            winner_id = play_sub_game(
+                player_1.cards.prefix(card_1, card_1 + card_2),
+                player_2.cards.prefix(card_2, card_1 + card_2),
+                cache,
             )
+            winner = player_1 if winner_id == 1 else player_2
         elif card_1 > card_2:
             winner = player_1
         else:
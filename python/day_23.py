@@ -1,4 +1,5 @@
 import dataclasses
+from array import array
 from typing import List
 
 import utils
@@ -85,6 +86,10 @@ class Cups:
 
         self._current_cup = self._current_cup.next
 
+    def play(self, rounds: int):
+        for _ in range(rounds):
+            self.round()
+
     def __getitem__(self, index: int) -> Cup:
         return self._cups[index]
 
@@ -98,9 +103,88 @@ class Cups:
         return "".join(values)
 
 
+class ArrayCup:
+    def __init__(self, value: int, next_cups: array):
+        self.value = value
+        self._next_cups = next_cups
+
+    @property
+    def next(self) -> 'ArrayCup':
+        return ArrayCup(self._next_cups[self.value], self._next_cups)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ArrayCup) and self.value == other.value
+
+
+class ArrayCups:
+    def __init__(self, cup_values: List[int], total_cups: int = None):
+        self._min = min(cup_values)
+        self._max = max(cup_values)
+        if total_cups is not None and total_cups > self._max:
+            extra_start = self._max + 1
+            self._max = total_cups
+        else:
+            extra_start = None
+
+        # _next_cups[label] is the label of the cup clockwise of it.
+        self._next_cups = array('I', range(1, self._max + 2))
+        for cup_value, next_value in zip(cup_values, cup_values[1:]):
+            self._next_cups[cup_value] = next_value
+
+        if extra_start is None:
+            self._next_cups[cup_values[-1]] = cup_values[0]
+        else:
+            self._next_cups[cup_values[-1]] = extra_start
+            self._next_cups[self._max] = cup_values[0]
+
+        self._current = cup_values[0]
+
+    def round(self):
+        self.play(1)
+
+    def play(self, rounds: int):
+        next_cups = self._next_cups
+        min_value = self._min
+        max_value = self._max
+        current = self._current
+
+        for _ in range(rounds):
+            pickup_1 = next_cups[current]
+            pickup_2 = next_cups[pickup_1]
+            pickup_3 = next_cups[pickup_2]
+            next_cups[current] = next_cups[pickup_3]
+
+            destination = current - 1 if current > min_value else max_value
+            while (
+                destination == pickup_1
+                or destination == pickup_2
+                or destination == pickup_3
+            ):
+                destination = (
+                    destination - 1 if destination > min_value else max_value
+                )
+
+            next_cups[pickup_3] = next_cups[destination]
+            next_cups[destination] = pickup_1
+            current = next_cups[current]
+
+        self._current = current
+
+    def __getitem__(self, index: int) -> ArrayCup:
+        return ArrayCup(index, self._next_cups)
+
+    def __str__(self) -> str:
+        values = []
+        cup_value = self._next_cups[1]
+        while cup_value != 1:
+            values.append(str(cup_value))
+            cup_value = self._next_cups[cup_value]
+
+        return "".join(values)
+
+
 def play(cups: Cups, rounds: int) -> str:
-    for _ in range(rounds):
-        cups.round()
+    cups.play(rounds)
 
     return cups
 
@@ -109,9 +193,9 @@ if __name__ == "__main__":
     cups = Cups([int(value) for value in utils.get_data(23)])
     assert str(play(cups, 100)) == "29385746"
 
-    cups= Cups(
-        [int(value) for value in utils.get_data(23)]
-        + list(range(10, 1000000 + 1))
-    )
+    cups = ArrayCups([int(value) for value in utils.get_data(23)])
+    assert str(play(cups, 100)) == "29385746"
+
+    cups = ArrayCups([int(value) for value in utils.get_data(23)], 1000000)
     cups = play(cups, 10000000)
     assert cups[1].next.value * cups[1].next.next.value == 680435423892
\ No newline at end of file
@@ -1,6 +1,9 @@
+from collections import Counter
 import dataclasses
+import numpy
+import os
 import re
-from typing import ClassVar, Dict, Generator, List, Set, Tuple
+from typing import ClassVar, Dict, Generator, Iterable, List, Set, Tuple
 
 import utils
 
@@ -38,10 +41,12 @@ class Vector:
         return f"E:{self.east},NE:{self.northeast}"
 
 
+DIRECTION_PATTERN = re.compile(f"({'|'.join(Vector.DIRECTIONS.keys())})")
+
+
 def parse_tile(tile_str: str) -> Vector:
     tile = Vector()
-    pattern = re.compile(f"({'|'.join(list(Vector.DIRECTIONS.keys()))})")
-    for direction in pattern.findall(tile_str):
+    for direction in DIRECTION_PATTERN.findall(tile_str):
         tile = tile.move(direction)
 
     return tile
@@ -84,17 +89,182 @@ def daily_flip(black_tiles: Set[Vector]) -> Set[Vector]:
     return new_black_tiles
 
 
-def flip(black_tiles: Set[Vector], days: int) -> Set[Vector]:
+class DenseHexGrid:
+    def __init__(self, black_tiles: Set[Vector]):
+        if black_tiles:
+            min_east = min(tile.east for tile in black_tiles)
+            min_northeast = min(tile.northeast for tile in black_tiles)
+            max_east = max(tile.east for tile in black_tiles)
+            max_northeast = max(tile.northeast for tile in black_tiles)
+        else:
+            min_east = min_northeast = max_east = max_northeast = 0
+
+        self._origin = (min_east, min_northeast)
+        self._grid = numpy.zeros(
+            (max_east - min_east + 1, max_northeast - min_northeast + 1),
+            dtype=bool,
+        )
+        for tile in black_tiles:
+            east = tile.east - min_east
+            northeast = tile.northeast - min_northeast
+            self._grid[east, northeast] = True
+
+    def _ensure_margin(self):
+        # Black tiles only spread one tile per day, so keeping the border
+        # white means no tile can fall off the grid. Grow geometrically to
+        # keep resizes rare.
+        grid = self._grid
+        if not (
+            grid[0].any() or grid[-1].any()
+            or grid[:, 0].any() or grid[:, -1].any()
+        ):
+            return
+
+        pad_east = max(1, grid.shape[0] // 2)
+        pad_northeast = max(1, grid.shape[1] // 2)
+        self._grid = numpy.pad(
+            grid, ((pad_east, pad_east), (pad_northeast, pad_northeast))
+        )
+        self._origin = (
+            self._origin[0] - pad_east, self._origin[1] - pad_northeast
+        )
+
+    def step(self):
+        self._ensure_margin()
+
+        padded = numpy.pad(self._grid, 1).astype(numpy.uint8)
+        rows, columns = self._grid.shape
+        black_neighbours = numpy.zeros(self._grid.shape, dtype=numpy.uint8)
+        for move_e, move_ne in Vector.DIRECTIONS.values():
+            black_neighbours += padded[
+                1 + move_e:1 + move_e + rows,
+                1 + move_ne:1 + move_ne + columns,
+            ]
+
+        self._grid = (black_neighbours == 2) | (
+            self._grid & (black_neighbours == 1)
+        )
+
+    def __len__(self) -> int:
+        return int(self._grid.sum())
+
+    @property
+    def black_tiles(self) -> Set[Vector]:
+        min_east, min_northeast = self._origin
+        return {
+            Vector(int(east) + min_east, int(northeast) + min_northeast)
+            for east, northeast in zip(*numpy.nonzero(self._grid))
+        }
+
+
+def flip(
+    black_tiles: Set[Vector], days: int, engine: str = "set"
+) -> Set[Vector]:
+    if engine == "dense":
+        grid = DenseHexGrid(black_tiles)
+        for _ in range(days):
+            grid.step()
+        return grid.black_tiles
+
+    if engine != "set":
+        raise ValueError(f"Unknown engine {engine!r}")
+
     for _  in range(days):
         black_tiles = daily_flip(black_tiles)
 
     return black_tiles
 
 
+# A tile (east, northeast) packs into the single int east * STRIDE +
+# northeast, so moving is adding a constant and hashing is free.
+STRIDE = 2 ** 32
+PACKED_DIRECTIONS = {
+    direction: move_e * STRIDE + move_ne
+    for direction, (move_e, move_ne) in Vector.DIRECTIONS.items()
+}
+
+
+def pack(tile: Vector) -> int:
+    return tile.east * STRIDE + tile.northeast
+
+
+def unpack(packed_tile: int) -> Vector:
+    northeast = (packed_tile + STRIDE // 2) % STRIDE - STRIDE // 2
+    return Vector((packed_tile - northeast) // STRIDE, northeast)
+
+
+def daily_flip_packed(black_tiles: Set[int]) -> Set[int]:
+    black_neighbours = Counter(
+        tile + delta
+        for tile in black_tiles
+        for delta in PACKED_DIRECTIONS.values()
+    )
+
+    return {
+        tile
+        for tile, count in black_neighbours.items()
+        if count == 2 or (count == 1 and tile in black_tiles)
+    }
+
+
+def flip_packed(black_tiles: Set[int], days: int) -> Set[int]:
+    for _ in range(days):
+        black_tiles = daily_flip_packed(black_tiles)
+
+    return black_tiles
+
+
+def parse_packed_tile(tile_str: str) -> int:
+    # "e" and "w" only appear on their own or as the second letter of a
+    # diagonal, so counting substrings gives every direction's count.
+    northeast = tile_str.count("ne")
+    northwest = tile_str.count("nw")
+    southeast = tile_str.count("se")
+    southwest = tile_str.count("sw")
+    counts = {
+        "e": tile_str.count("e") - northeast - southeast,
+        "ne": northeast,
+        "nw": northwest,
+        "w": tile_str.count("w") - northwest - southwest,
+        "sw": southwest,
+        "se": southeast,
+    }
+    return sum(
+        count * PACKED_DIRECTIONS[direction]
+        for direction, count in counts.items()
+    )
+
+
+def iter_packed_tiles(path: str) -> Generator[int, None, None]:
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield parse_packed_tile(line)
+
+
+def get_black_tiles_packed(packed_tiles: Iterable[int]) -> Set[int]:
+    black_tiles = set()
+    for tile in packed_tiles:
+        if tile in black_tiles:
+            black_tiles.remove(tile)
+        else:
+            black_tiles.add(tile)
+
+    return black_tiles
+
+
 if __name__ == "__main__":
     tiles = parse_tiles()
 
     black_tiles = get_black_tiles(tiles)
     assert len(black_tiles) == 277
 
-    assert len(flip(black_tiles, 100)) == 3531
\ No newline at end of file
+    flipped_tiles = flip(black_tiles, 100)
+    assert len(flipped_tiles) == 3531
+    assert flip(black_tiles, 100, engine="dense") == flipped_tiles
+
+    packed_tiles = get_black_tiles_packed(
+        iter_packed_tiles(os.path.join(utils.DATA_DIR, "day_24.txt"))
+    )
+    assert packed_tiles == {pack(tile) for tile in black_tiles}
+    assert len(flip_packed(packed_tiles, 100)) == 3531
\ No newline at end of file
@@ -1,23 +1,257 @@
+import math
+import numpy
+from typing import Dict, Iterable, List, Optional
+
 import utils
 
 
-def loop(value: int, subject_num: int) -> int:
-    return (value * subject_num) % 20201227
+MODULUS = 20201227
+SUBJECT_NUM = 7
+
+
+def loop(value: int, subject_num: int, modulus: int = MODULUS) -> int:
+    return (value * subject_num) % modulus
+
+
+def factorise(num: int) -> Dict[int, int]:
+    factors = {}
+    factor = 2
+    while factor * factor <= num:
+        while num % factor == 0:
+            factors[factor] = factors.get(factor, 0) + 1
+            num //= factor
+        factor += 1 if factor == 2 else 2
+    if num > 1:
+        factors[num] = factors.get(num, 0) + 1
+    return factors
 
 
-def get_public_key(public_key: int) -> int:
+def get_order(subject_num: int, modulus: int) -> int:
+    # Assumes the modulus is prime, so the group has order modulus - 1.
+    order = modulus - 1
+    for factor in factorise(order):
+        while order % factor == 0 and pow(
+            subject_num, order // factor, modulus
+        ) == 1:
+            order //= factor
+    return order
+
+
+def baby_step_giant_step(
+    target: int, subject_num: int, modulus: int, order: int
+) -> Optional[int]:
+    step = math.isqrt(order - 1) + 1
+
+    baby_steps = {}
     value = 1
-    count = 0
-    while value != public_key:
-        value = loop(value, 7)
-        count += 1
-    return count
+    for count in range(step):
+        baby_steps.setdefault(value, count)
+        value = loop(value, subject_num, modulus)
+
+    giant_step = pow(subject_num, -step, modulus)
+    value = target % modulus
+    for count in range(step):
+        if value in baby_steps:
+            return count * step + baby_steps[value]
+        value = loop(value, giant_step, modulus)
+
+    return None
+
+
+def pohlig_hellman(
+    target: int, subject_num: int, modulus: int, order: int
+) -> Optional[int]:
+    residues: List[int] = []
+    moduli: List[int] = []
+    for factor, power in factorise(order).items():
+        prime_power = factor ** power
+        sub_subject = pow(subject_num, order // prime_power, modulus)
+        sub_target = pow(target, order // prime_power, modulus)
+        # sub_subject^(prime_power / factor) generates the order-factor
+        # subgroup; solve one base-factor digit of the exponent at a time.
+        digit_subject = pow(sub_subject, prime_power // factor, modulus)
+
+        exponent = 0
+        for digit_index in range(power):
+            remaining = sub_target * pow(sub_subject, -exponent, modulus)
+            remaining = pow(
+                remaining % modulus,
+                prime_power // factor ** (digit_index + 1),
+                modulus,
+            )
+            digit = baby_step_giant_step(
+                remaining, digit_subject, modulus, factor
+            )
+            if digit is None:
+                return None
+            exponent += digit * factor ** digit_index
+
+        residues.append(exponent)
+        moduli.append(prime_power)
+
+    result = 0
+    for residue, prime_power in zip(residues, moduli):
+        partial = order // prime_power
+        result += residue * partial * pow(partial, -1, prime_power)
+    return result % order
+
+
+def discrete_log(
+    target: int,
+    subject_num: int = SUBJECT_NUM,
+    modulus: int = MODULUS,
+    use_pohlig_hellman: bool = True,
+) -> int:
+    order = get_order(subject_num, modulus)
+    if use_pohlig_hellman:
+        result = pohlig_hellman(target, subject_num, modulus, order)
+    else:
+        result = baby_step_giant_step(target, subject_num, modulus, order)
+
+    if result is None or pow(subject_num, result, modulus) != target % modulus:
+        raise ValueError(
+            f"{target} is not a power of {subject_num} modulo {modulus}"
+        )
+    return result
+
+
+def get_public_key(
+    public_key: int, subject_num: int = SUBJECT_NUM, modulus: int = MODULUS
+) -> int:
+    return discrete_log(public_key, subject_num, modulus)
+
+
+class BabyStepTable:
+    _HEADER_LEN = 4
+
+    def __init__(
+        self,
+        subject_num: int,
+        modulus: int,
+        order: int,
+        step: int,
+        values: numpy.ndarray,
+        counts: numpy.ndarray,
+    ):
+        self.subject_num = subject_num
+        self.modulus = modulus
+        self.order = order
+        self.step = step
+        self._values = values
+        self._counts = counts
+
+    @classmethod
+    def build(
+        cls,
+        subject_num: int = SUBJECT_NUM,
+        modulus: int = MODULUS,
+        step: Optional[int] = None,
+    ) -> 'BabyStepTable':
+        if modulus > 2 ** 64:
+            raise ValueError(
+                f"Modulus {modulus} does not fit the table's uint64 residues"
+            )
+
+        order = get_order(subject_num, modulus)
+        if step is None:
+            step = math.isqrt(order - 1) + 1
+
+        values = numpy.empty(step, dtype=numpy.uint64)
+        value = 1
+        for count in range(step):
+            values[count] = value
+            value = loop(value, subject_num, modulus)
+
+        # A stable sort keeps the smallest count first for repeated values.
+        counts = numpy.argsort(values, kind="stable").astype(numpy.uint64)
+        values = values[counts]
+        unique = numpy.ones(step, dtype=bool)
+        unique[1:] = values[1:] != values[:-1]
+
+        return cls(
+            subject_num, modulus, order, step, values[unique], counts[unique]
+        )
+
+    def save(self, path: str):
+        header = numpy.array(
+            [self.subject_num, self.modulus, self.order, self.step],
+            dtype=numpy.uint64,
+        )
+        # Write through a handle so numpy.save does not append ".npy" and
+        # load() reads back exactly the path it was given.
+        with open(path, "wb") as f:
+            numpy.save(
+                f, numpy.concatenate([header, self._values, self._counts])
+            )
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'BabyStepTable':
+        data = numpy.load(path, mmap_mode="r" if mmap else None)
+        subject_num, modulus, order, step = (
+            int(value) for value in data[:cls._HEADER_LEN]
+        )
+        table_len = (len(data) - cls._HEADER_LEN) // 2
+        values = data[cls._HEADER_LEN:cls._HEADER_LEN + table_len]
+        counts = data[cls._HEADER_LEN + table_len:]
+        return cls(subject_num, modulus, order, step, values, counts)
+
+    def solve(self, public_keys: Iterable[int]) -> List[int]:
+        public_keys = [int(public_key) for public_key in public_keys]
+        results: List[Optional[int]] = [None] * len(public_keys)
+
+        # Residues always fit in uint64 (build rejects larger moduli), but
+        # the product of two only does below 2^32; past that multiply as
+        # Python ints held in an object array.
+        dtype = numpy.uint64 if self.modulus <= 2 ** 32 else object
+        giant_step = pow(self.subject_num, -self.step, self.modulus)
+        pending = numpy.arange(len(public_keys))
+        current = numpy.array(
+            [public_key % self.modulus for public_key in public_keys],
+            dtype=dtype,
+        )
+
+        giant_count = -(-self.order // self.step)
+        for count in range(giant_count):
+            if not len(pending):
+                break
+
+            lookup = current.astype(numpy.uint64)
+            positions = numpy.searchsorted(self._values, lookup)
+            positions[positions == len(self._values)] = 0
+            found = self._values[positions] == lookup
+            for index, position in zip(pending[found], positions[found]):
+                results[index] = (
+                    count * self.step + int(self._counts[position])
+                )
+
+            pending = pending[~found]
+            current = (current[~found] * giant_step) % self.modulus
+
+        for public_key, result in zip(public_keys, results):
+            if result is None:
+                raise ValueError(
+                    f"{public_key} is not a power of {self.subject_num} "
+                    f"modulo {self.modulus}"
+                )
+        return results
+
+
+def get_public_keys(
+    public_keys: Iterable[int], table: Optional[BabyStepTable] = None
+) -> List[int]:
+    if table is None:
+        table = BabyStepTable.build()
+    return table.solve(public_keys)
 
 
 if __name__ == "__main__":
     card_key, door_key = (int(value) for value in utils.get_data(25).splitlines())
 
     loop_num = get_public_key(card_key)
-    encryption_key = pow(door_key, loop_num, 20201227)
+    encryption_key = pow(door_key, loop_num, MODULUS)
+
+    assert encryption_key == 8329514
 
-    assert encryption_key == 8329514
\ No newline at end of file
+    card_loop_num, door_loop_num = get_public_keys([card_key, door_key])
+    assert card_loop_num == loop_num
+    assert pow(card_key, door_loop_num, MODULUS) == encryption_key